@@ -10,66 +10,188 @@ to test.
 from __future__ import annotations
 
 import argparse
+import functools
+import heapq
 import json
+import operator
+import os
+import re
+import shlex
 import shutil
 import subprocess
 import sys
-from datetime import datetime
+import tempfile
+import time
 from pathlib import Path
-from typing import Iterable, List, Tuple
-
-
-def run_cmd(cmd: List[str], check: bool = True) -> subprocess.CompletedProcess[str]:
-    """Run a command and return the completed process."""
+from typing import Iterable, Iterator, List, Mapping, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
+
+# One pass over `iw dev <iface> scan` output; group index identifies the field.
+# BSSIDs are matched as MACs so indented "BSS Load:" lines don't start a record.
+SCAN_LINE_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"BSS ([0-9A-Fa-f]{2}(?::[0-9A-Fa-f]{2}){5})"
+    r"|freq: (\d+)"
+    r"|signal: (-?\d+\.?\d*)"
+    r"|SSID:[ \t]*([^\n]*?)[ \t]*$"
+    r"|DS Parameter set: channel (\d+)"
+    r"|capability:[ \t]*([^\n]*?)[ \t]*$"
+    r"|(RSN|WPA|WEP):"
+    r")",
+    re.MULTILINE,
+)
+
+# Small, fixed environment for child tools: C-locale output keeps the parsers
+# stable (no decimal commas or translated labels) and keeps envp short on exec.
+_C_ENV = {
+    "LC_ALL": "C",
+    "LANG": "C",
+    "PATH": os.environ.get("PATH", ""),
+    "HOME": os.environ.get("HOME", ""),
+}
+
+# C-level equivalent of `lambda n: n.get("signal_dbm", -999)` for ranking.
+_signal_key = operator.methodcaller("get", "signal_dbm", -999)
+
+# Interface types set_monitor_mode() may interpolate into its shell script.
+_IFACE_TYPES = frozenset({"monitor", "managed"})
+
+# Prefix lengths for `iw dev` lines parsed by list_ifaces().
+_P_INTERFACE = len("Interface")
+_P_TYPE = len("type")
+_P_CHANNEL = len("channel")
+_P_TXPOWER = len("txpower")
+
+# Security labels are OR'd into a bitmask while parsing and expanded once per
+# record; the table is indexed by mask and keeps labels in sorted order.
+_SEC_BITS = {"RSN": 1, "WPA": 2, "WEP": 4}
+_SEC_TABLE = (
+    (),
+    ("RSN",),
+    ("WPA",),
+    ("RSN", "WPA"),
+    ("WEP",),
+    ("RSN", "WEP"),
+    ("WEP", "WPA"),
+    ("RSN", "WEP", "WPA"),
+)
+
+# System tools each subcommand shells out to; checked once up front in main().
+COMMAND_BINS = {
+    "status": ("iw",),
+    "list-ifaces": ("iw",),
+    "monitor-on": ("ip", "iw"),
+    "monitor-off": ("ip", "iw"),
+    "survey": ("iw",),
+    "capture": ("tshark",),
+    "report": (),
+}
+
+
+def _dumps(obj: object) -> bytes:
+    """Encode compact JSON bytes, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _default_file_mode() -> int:
+    """Mode open() would give a new file under the current umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _utc_now_iso() -> str:
+    """Current UTC time as an ISO-8601 string with a Z suffix, second precision."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def run_cmd(
+    cmd: List[str],
+    check: bool = True,
+    env: Mapping[str, str] | None = None,
+) -> subprocess.CompletedProcess[str]:
+    """Run a command (C locale by default) and return the completed process."""
     return subprocess.run(
         cmd,
         check=check,
         capture_output=True,
         text=True,
+        env=_C_ENV if env is None else env,
+        # Callers never feed stdin, so children get /dev/null rather than ours.
+        # Python's own fds are non-inheritable (PEP 446), so skip the close scan.
+        stdin=subprocess.DEVNULL,
+        close_fds=False,
     )
 
 
+@functools.lru_cache(maxsize=None)
+def _which(binary: str) -> str | None:
+    return shutil.which(binary)
+
+
 def ensure_bins(binaries: Iterable[str]) -> None:
-    missing = [b for b in binaries if shutil.which(b) is None]
+    missing = [b for b in binaries if _which(b) is None]
     if missing:
         sys.exit(f"Missing required binaries: {', '.join(missing)}")
 
 
-def parse_scan_output(scan_output: str) -> List[dict]:
-    """Parse `iw dev <iface> scan` output into a lightweight list."""
-    networks = []
+def _iter_scan_records(matches: Iterable[re.Match[str]]) -> Iterator[dict]:
+    """Fold SCAN_LINE_RE matches into one dict per BSS, yielding each as it closes."""
     current: dict = {}
-    for raw_line in scan_output.splitlines():
-        line = raw_line.strip()
-        if line.startswith("BSS "):
+    # security bits for the open record; reset at each BSS boundary
+    mask = 0
+    for match in matches:
+        group = match.lastindex
+        value = match.group(group)
+        if group == 1:
             if current:
-                networks.append(current)
-            current = {"bssid": line.split()[1].strip("()")}
-        elif line.startswith("freq:"):
-            current["freq_mhz"] = int(line.split("freq:")[1].strip())
-        elif line.startswith("signal:"):
-            signal_value = line.split("signal:")[1].split()[0]
-            current["signal_dbm"] = float(signal_value)
-        elif line.startswith("SSID:"):
-            current["ssid"] = line.split("SSID:")[1].strip()
-        elif line.startswith("DS Parameter set: channel "):
-            channel = line.split("channel ")[1].strip()
-            current["channel"] = int(channel)
-        elif line.startswith("capability:"):
-            current["capability"] = line.split("capability:")[1].strip()
-        elif line.startswith("RSN:"):
-            current.setdefault("security", set()).add("RSN")
-        elif line.startswith("WPA:"):
-            current.setdefault("security", set()).add("WPA")
-        elif line.startswith("WEP:"):
-            current.setdefault("security", set()).add("WEP")
+                yield _finish_record(current, mask)
+            current = {"bssid": value}
+            mask = 0
+        elif group == 2:
+            current["freq_mhz"] = int(value)
+        elif group == 3:
+            current["signal_dbm"] = float(value)
+        elif group == 4:
+            current["ssid"] = value
+        elif group == 5:
+            current["channel"] = int(value)
+        elif group == 6:
+            current["capability"] = value
+        else:
+            mask |= _SEC_BITS[value]
     if current:
-        networks.append(current)
-    # convert any sets to sorted lists for JSON safety
-    for net in networks:
-        if isinstance(net.get("security"), set):
-            net["security"] = sorted(net["security"])
-    return networks
+        yield _finish_record(current, mask)
+
+
+def _finish_record(net: dict, mask: int) -> dict:
+    if mask:
+        # copy so callers get their own list, as before the bitmask
+        net["security"] = list(_SEC_TABLE[mask])
+    return net
+
+
+def parse_scan_output(scan_output: str) -> List[dict]:
+    """Parse buffered `iw dev <iface> scan` output into a lightweight list.
+
+    survey() streams with parse_scan_stream(); this is the equivalent for
+    callers that already hold the whole scan as a string.
+    """
+    return list(_iter_scan_records(SCAN_LINE_RE.finditer(scan_output)))
+
+
+def parse_scan_stream(lines: Iterable[str]) -> Iterator[dict]:
+    """Incrementally parse `iw dev <iface> scan` lines, yielding one dict per BSS."""
+    return _iter_scan_records(filter(None, map(SCAN_LINE_RE.match, lines)))
 
 
 def list_ifaces() -> List[dict]:
@@ -80,18 +202,19 @@ def list_ifaces() -> List[dict]:
     current: dict = {}
     for raw in proc.stdout.splitlines():
         line = raw.strip()
+        # Prefixes are fixed, so slice past them instead of splitting the whole line.
         if line.startswith("Interface"):
             if current:
                 ifaces.append(current)
-            current = {"name": line.split()[1]}
+            current = {"name": line[_P_INTERFACE:].split(None, 1)[0]}
         elif line.startswith("type") and current:
-            current["type"] = line.split()[1]
+            current["type"] = line[_P_TYPE:].split(None, 1)[0]
         elif line.startswith("channel") and current:
-            parts = line.split()
-            if len(parts) >= 2 and parts[1].isdigit():
-                current["channel"] = int(parts[1])
+            parts = line[_P_CHANNEL:].split(None, 1)
+            if parts and parts[0].isdigit():
+                current["channel"] = int(parts[0])
         elif line.startswith("txpower") and current:
-            current["txpower_dbm"] = line.split()[1]
+            current["txpower_dbm"] = line[_P_TXPOWER:].split(None, 1)[0]
     if current:
         ifaces.append(current)
     return ifaces
@@ -99,16 +222,42 @@ def list_ifaces() -> List[dict]:
 
 def survey(iface: str, outfile: Path) -> Tuple[int, Path]:
     ensure_bins(["iw"])
-    scan = run_cmd(["iw", "dev", iface, "scan"])
-    networks = parse_scan_output(scan.stdout)
+    cmd = ["iw", "dev", iface, "scan"]
+    captured_at = _utc_now_iso()
     outfile.parent.mkdir(parents=True, exist_ok=True)
-    payload = {
-        "captured_at": datetime.utcnow().isoformat() + "Z",
-        "iface": iface,
-        "networks": networks,
-    }
-    outfile.write_text(json.dumps(payload, indent=2))
-    return len(networks), outfile
+    count = 0
+    # Stream records straight from the pipe into a temp file next to the target
+    # so peak memory stays at one BSS record; the previous survey is only
+    # replaced once iw has exited cleanly. stderr goes to the terminal.
+    fd, tmp_name = tempfile.mkstemp(dir=outfile.parent, prefix=f".{outfile.name}.", suffix=".tmp")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as fh, subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            env=_C_ENV,
+        ) as proc:
+            # mkstemp creates 0600; give the survey the mode a plain open() would
+            # so a root-run survey stays readable by `report` as a normal user.
+            os.fchmod(fh.fileno(), _default_file_mode())
+            fh.write(b'{\n  "captured_at": ' + _dumps(captured_at))
+            fh.write(b',\n  "iface": ' + _dumps(iface))
+            fh.write(b',\n  "networks": [')
+            for net in parse_scan_stream(proc.stdout):
+                fh.write(b",\n    " if count else b"\n    ")
+                fh.write(_dumps(net))
+                count += 1
+            fh.write(b"\n  ]\n}\n" if count else b"]\n}\n")
+        if proc.returncode:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+        os.replace(tmp_path, outfile)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return count, outfile
 
 
 def iface_status(iface: str) -> str:
@@ -120,13 +269,16 @@ def iface_status(iface: str) -> str:
 def set_monitor_mode(iface: str, enabled: bool) -> None:
     ensure_bins(["ip", "iw"])
     state = "monitor" if enabled else "managed"
-    cmds = [
-        ["sudo", "ip", "link", "set", iface, "down"],
-        ["sudo", "iw", "dev", iface, "set", "type", state],
-        ["sudo", "ip", "link", "set", iface, "up"],
-    ]
-    for cmd in cmds:
-        run_cmd(cmd)
+    if state not in _IFACE_TYPES:
+        sys.exit(f"Unsupported interface type: {state}")
+    # One sudo/shell for down -> set type -> up instead of three sudo round trips.
+    quoted = shlex.quote(iface)
+    script = (
+        f"ip link set {quoted} down"
+        f" && iw dev {quoted} set type {state}"
+        f" && ip link set {quoted} up"
+    )
+    run_cmd(["sudo", "sh", "-c", script])
 
 
 def capture_handshake(
@@ -146,7 +298,7 @@ def capture_handshake(
         capture_cmd += ["-f", f"wlan host {bssid}"]
     print(f"[+] Capturing for {seconds}s on {iface} -> {outfile}")
     try:
-        subprocess.run(capture_cmd, check=True)
+        subprocess.run(capture_cmd, check=True, env=_C_ENV)
     except subprocess.CalledProcessError as err:
         sys.exit(f"Capture failed: {err}")
     return outfile
@@ -155,32 +307,73 @@ def capture_handshake(
 def render_markdown_report(survey_json: Path, markdown_out: Path) -> Path:
     if not survey_json.exists():
         sys.exit(f"Survey file not found: {survey_json}")
-    data = json.loads(survey_json.read_text())
+    data = _loads(survey_json.read_bytes())
     networks = data.get("networks", [])
-    sorted_nets = sorted(
-        networks, key=lambda n: n.get("signal_dbm", -999), reverse=True
-    )[:10]
-    lines = [
-        f"# Alfa Scout survey report",
-        f"- captured_at: {data.get('captured_at', 'unknown')}",
-        f"- iface: {data.get('iface', 'unknown')}",
-        "",
-        "## Top networks by signal",
-        "| SSID | BSSID | Channel | Signal (dBm) | Security |",
-        "| --- | --- | --- | --- | --- |",
-    ]
-    for net in sorted_nets:
-        lines.append(
-            f"| {net.get('ssid','(hidden)')} | {net.get('bssid','?')} | "
-            f"{net.get('channel','?')} | {net.get('signal_dbm','?')} | "
-            f"{'/'.join(net.get('security',[]) or ['?'])} |"
+    sorted_nets = heapq.nlargest(10, networks, key=_signal_key)
+    header = (
+        "# Alfa Scout survey report\n"
+        "- captured_at: %s\n"
+        "- iface: %s\n"
+        "\n"
+        "## Top networks by signal\n"
+        "| SSID | BSSID | Channel | Signal (dBm) | Security |\n"
+        "| --- | --- | --- | --- | --- |\n"
+    ) % (data.get("captured_at", "unknown"), data.get("iface", "unknown"))
+    rows = (
+        "| %s | %s | %s | %s | %s |\n"
+        % (
+            net.get("ssid", "(hidden)"),
+            net.get("bssid", "?"),
+            net.get("channel", "?"),
+            net.get("signal_dbm", "?"),
+            "/".join(net.get("security") or ["?"]),
         )
-    report = "\n".join(lines) + "\n"
+        for net in sorted_nets
+    )
     markdown_out.parent.mkdir(parents=True, exist_ok=True)
-    markdown_out.write_text(report)
+    with markdown_out.open("wb") as fh:
+        fh.write(header.encode("utf-8"))
+        fh.writelines(row.encode("utf-8") for row in rows)
     return markdown_out
 
 
+def _cmd_status(args: argparse.Namespace) -> None:
+    print(iface_status(args.iface))
+
+
+def _cmd_list_ifaces(args: argparse.Namespace) -> None:
+    for iface in list_ifaces():
+        print(
+            f"{iface.get('name')}  type={iface.get('type','?')}  "
+            f"channel={iface.get('channel','?')}  txpower={iface.get('txpower_dbm','?')}"
+        )
+
+
+def _cmd_monitor_on(args: argparse.Namespace) -> None:
+    set_monitor_mode(args.iface, enabled=True)
+    print(f"[+] {args.iface} set to monitor mode.")
+
+
+def _cmd_monitor_off(args: argparse.Namespace) -> None:
+    set_monitor_mode(args.iface, enabled=False)
+    print(f"[+] {args.iface} set to managed mode.")
+
+
+def _cmd_survey(args: argparse.Namespace) -> None:
+    count, path = survey(args.iface, args.out)
+    print(f"[+] Survey complete: {count} networks -> {path}")
+
+
+def _cmd_capture(args: argparse.Namespace) -> None:
+    path = capture_handshake(args.iface, args.out, args.seconds, args.channel, args.bssid)
+    print(f"[+] Capture saved to {path}")
+
+
+def _cmd_report(args: argparse.Namespace) -> None:
+    out_path = render_markdown_report(args.report_in, args.report_out)
+    print(f"[+] Markdown report written to {out_path}")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Alfa Scout - Wi-Fi helper for the Alfa AWUS036ACM (Linux). "
@@ -189,13 +382,14 @@ def main() -> None:
     parser.add_argument("--iface", default="wlan0", help="Wireless interface (default: wlan0)")
     sub = parser.add_subparsers(dest="command", required=True)
 
-    sub.add_parser("status", help="Show interface status (iw info)")
-    sub.add_parser("list-ifaces", help="List wireless interfaces (iw dev)")
+    sub.add_parser("status", help="Show interface status (iw info)").set_defaults(func=_cmd_status)
+    sub.add_parser("list-ifaces", help="List wireless interfaces (iw dev)").set_defaults(func=_cmd_list_ifaces)
 
-    sub.add_parser("monitor-on", help="Switch interface to monitor mode")
-    sub.add_parser("monitor-off", help="Switch interface back to managed mode")
+    sub.add_parser("monitor-on", help="Switch interface to monitor mode").set_defaults(func=_cmd_monitor_on)
+    sub.add_parser("monitor-off", help="Switch interface back to managed mode").set_defaults(func=_cmd_monitor_off)
 
     survey_parser = sub.add_parser("survey", help="Run a scan and write JSON results")
+    survey_parser.set_defaults(func=_cmd_survey)
     survey_parser.add_argument(
         "--out",
         type=Path,
@@ -204,6 +398,7 @@ def main() -> None:
     )
 
     capture_parser = sub.add_parser("capture", help="Capture an authorized handshake/traffic sample")
+    capture_parser.set_defaults(func=_cmd_capture)
     capture_parser.add_argument(
         "--out",
         type=Path,
@@ -215,6 +410,7 @@ def main() -> None:
     capture_parser.add_argument("--bssid", help="Target BSSID filter to narrow capture")
 
     report_parser = sub.add_parser("report", help="Render a Markdown report from a survey JSON")
+    report_parser.set_defaults(func=_cmd_report)
     report_parser.add_argument(
         "--in",
         dest="report_in",
@@ -231,32 +427,9 @@ def main() -> None:
     )
 
     args = parser.parse_args()
+    ensure_bins(COMMAND_BINS.get(args.command, ()))
 
-    if args.command == "status":
-        print(iface_status(args.iface))
-    elif args.command == "list-ifaces":
-        for iface in list_ifaces():
-            print(
-                f"{iface.get('name')}  type={iface.get('type','?')}  "
-                f"channel={iface.get('channel','?')}  txpower={iface.get('txpower_dbm','?')}"
-            )
-    elif args.command == "monitor-on":
-        set_monitor_mode(args.iface, enabled=True)
-        print(f"[+] {args.iface} set to monitor mode.")
-    elif args.command == "monitor-off":
-        set_monitor_mode(args.iface, enabled=False)
-        print(f"[+] {args.iface} set to managed mode.")
-    elif args.command == "survey":
-        count, path = survey(args.iface, args.out)
-        print(f"[+] Survey complete: {count} networks -> {path}")
-    elif args.command == "capture":
-        path = capture_handshake(args.iface, args.out, args.seconds, args.channel, args.bssid)
-        print(f"[+] Capture saved to {path}")
-    elif args.command == "report":
-        out_path = render_markdown_report(args.report_in, args.report_out)
-        print(f"[+] Markdown report written to {out_path}")
-    else:
-        parser.print_help()
+    args.func(args)
 
 
 if __name__ == "__main__":
@@ -2,22 +2,54 @@
 """
 Lab Queue - lightweight task queue for security lab work.
 
-Keeps a JSON queue of targets/experiments with notes and scope reminders,
-plus Markdown export for reports. Linux CLI, zero external deps.
+Keeps an append-only JSON-lines queue of targets/experiments with notes and
+scope reminders, plus Markdown export for reports. Linux CLI, zero required
+deps; uses orjson for the DB file when it is installed.
 """
 
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
+import os
 import sys
 import time
-from dataclasses import asdict, dataclass, field
-from datetime import datetime
+from dataclasses import MISSING, asdict, dataclass, field, fields
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 
-DB_PATH = Path(__file__).parent / "db.json"
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
+
+DB_PATH = Path(__file__).parent / "db.jsonl"
+# Default location used before the JSON-lines switch; migrated on first use.
+LEGACY_DB_PATH = Path(__file__).parent / "db.json"
+
+# Lazily seeded on the first add so ids never collide within a run or with stored items.
+_id_counter: Iterator[int] | None = None
+
+ITEM_BLOCK = (
+    "## %(title)s\n- id: `%(id)s`\n- status: %(status)s\n"
+    "- severity: %(severity)s\n- created_at: %(created_at)s\n"
+)
+
+
+def _dumps(obj: object) -> bytes:
+    """Encode one compact JSON line; orjson serializes Items without an asdict() pass."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), default=asdict).encode("utf-8")
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _utc_now_iso() -> str:
+    """Current UTC time as an ISO-8601 string with a Z suffix, second precision."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
 
 @dataclass
@@ -28,119 +60,261 @@ class Item:
     notes: str = ""
     severity: str = "info"
     status: str = "queued"
-    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat() + "Z")
+    created_at: str = field(default_factory=_utc_now_iso)
+
+
+# Field defaults for rows written by hand or by older versions; created_at is
+# filled separately because Item builds it from a factory.
+_ITEM_DEFAULTS = {f.name: f.default for f in fields(Item) if f.default is not MISSING}
+
+
+def _fill_defaults(entry: dict) -> dict:
+    """Give a raw row the same defaults Item(**entry) would, in place."""
+    for key, value in _ITEM_DEFAULTS.items():
+        entry.setdefault(key, value)
+    if "created_at" not in entry:
+        entry["created_at"] = _utc_now_iso()
+    return entry
 
 
 def load_db(db_path: Path) -> List[Item]:
+    return [Item(**entry) for entry in load_db_raw(db_path)]
+
+
+def _is_legacy_data(data: bytes) -> bool:
+    """True if data is an old JSON-array DB rather than JSON lines."""
+    return data.lstrip()[:1] == b"["
+
+
+def _is_legacy_db(db_path: Path) -> bool:
+    """_is_legacy_data() for a file, reading only up to the first non-blank byte."""
+    with db_path.open("rb") as fh:
+        while chunk := fh.read(4096):
+            if chunk.strip():
+                return _is_legacy_data(chunk)
+    return False
+
+
+def load_db_raw(db_path: Path) -> List[dict]:
+    """Load the DB as plain dicts; read paths skip building an Item per row."""
     if not db_path.exists():
         return []
-    raw = json.loads(db_path.read_text())
-    return [Item(**entry) for entry in raw]
+    return _parse_db(db_path.read_bytes())
+
+
+def _parse_db(data: bytes) -> List[dict]:
+    """Decode DB contents into item dicts.
 
+    Each line is either an item or a ``{"patch": <id>, ...}`` record whose
+    remaining fields are applied to that item. Legacy ``db.json`` files (a
+    single JSON array) are still read as-is. With duplicate ids the first row
+    wins, matching the linear scan the JSON-array DB used.
+    """
+    if _is_legacy_data(data):
+        return [_fill_defaults(entry) for entry in _loads(data)]
+    items: List[dict] = []
+    by_id: dict = {}
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        record = _loads(line)
+        target_id = record.pop("patch", None)
+        if target_id is None:
+            items.append(_fill_defaults(record))
+            by_id.setdefault(record["id"], record)
+        elif target_id in by_id:
+            by_id[target_id].update(record)
+    return items
 
-def save_db(db_path: Path, items: List[Item]) -> None:
+
+def save_db(db_path: Path, items: List[dict]) -> None:
+    """Rewrite the whole DB as JSON lines, one line per given item."""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with db_path.open("wb") as fh:
+        fh.writelines(_dumps(item) + b"\n" for item in items)
+
+
+def _append_record(db_path: Path, record: object, legacy: bool) -> None:
+    """Append one JSON line; ``legacy`` is the caller's _is_legacy_db() result."""
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    db_path.write_text(json.dumps([asdict(i) for i in items], indent=2))
+    if legacy:
+        # one-off conversion of an old JSON-array DB before the first append
+        save_db(db_path, load_db_raw(db_path))
+    with db_path.open("ab") as fh:
+        fh.write(_dumps(record) + b"\n")
+
+
+def migrate_default_db() -> None:
+    """Convert the old default db.json to db.jsonl if only the former exists.
+
+    The legacy file is left in place as a backup.
+    """
+    if DB_PATH.exists() or not LEGACY_DB_PATH.exists():
+        return
+    save_db(DB_PATH, load_db_raw(LEGACY_DB_PATH))
+    print(f"[+] Migrated {LEGACY_DB_PATH} -> {DB_PATH}", file=sys.stderr)
+
+
+def append_item(db_path: Path, item: Item, legacy: bool | None = None) -> None:
+    if legacy is None:
+        legacy = db_path.exists() and _is_legacy_db(db_path)
+    _append_record(db_path, item, legacy)
+
+
+def _last_stored_id(db_path: Path, legacy: bool) -> int:
+    """Id of the newest item, read back from the end of the file (0 if none).
+
+    Items are only ever appended with increasing ids and patch lines only
+    reference existing items, so the last item line holds the largest id.
+    """
+    if legacy:
+        # converted on the append that follows anyway
+        return max((entry["id"] for entry in load_db_raw(db_path)), default=0)
+    if not db_path.exists():
+        return 0
+    with db_path.open("rb") as fh:
+        pos = fh.seek(0, os.SEEK_END)
+        partial = b""
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            fh.seek(pos)
+            lines = (fh.read(step) + partial).split(b"\n")
+            # the first piece may be cut mid-line unless we reached the start
+            partial = lines.pop(0) if pos else b""
+            for line in reversed(lines):
+                if line.strip():
+                    record = _loads(line)
+                    if "patch" not in record:
+                        return record["id"]
+    return 0
+
+
+def _next_id(db_path: Path, legacy: bool) -> int:
+    """Next millisecond-epoch style id, past every stored id and strictly increasing."""
+    global _id_counter
+    if _id_counter is None:
+        start = time.time_ns() // 1_000_000
+        start = max(start, _last_stored_id(db_path, legacy) + 1)
+        _id_counter = itertools.count(start)
+    return next(_id_counter)
 
 
 def add_item(db_path: Path, title: str, scope: str, notes: str, severity: str) -> Item:
-    items = load_db(db_path)
-    item = Item(id=int(time.time() * 1000), title=title, scope=scope, notes=notes, severity=severity)
-    items.append(item)
-    save_db(db_path, items)
+    # one format check per add, shared by id seeding and the append
+    legacy = db_path.exists() and _is_legacy_db(db_path)
+    item = Item(id=_next_id(db_path, legacy), title=title, scope=scope, notes=notes, severity=severity)
+    append_item(db_path, item, legacy)
     return item
 
 
-def list_items(db_path: Path) -> List[Item]:
-    return load_db(db_path)
+def list_items(db_path: Path) -> List[dict]:
+    return load_db_raw(db_path)
 
 
-def complete_item(db_path: Path, item_id: int) -> Item:
-    items = load_db(db_path)
-    for item in items:
-        if item.id == item_id:
-            item.status = "done"
-            save_db(db_path, items)
-            return item
-    sys.exit(f"Item not found: {item_id}")
+def complete_item(db_path: Path, item_id: int) -> dict:
+    data = db_path.read_bytes() if db_path.exists() else b""
+    by_id: dict = {}
+    for item in _parse_db(data):
+        # first row wins on duplicate ids, like the old linear scan
+        by_id.setdefault(item["id"], item)
+    item = by_id.get(item_id)
+    if item is None:
+        sys.exit(f"Item not found: {item_id}")
+    item["status"] = "done"
+    _append_record(db_path, {"patch": item_id, "status": "done"}, _is_legacy_data(data))
+    return item
 
 
-def next_item(db_path: Path) -> Item | None:
-    items = load_db(db_path)
-    for item in items:
-        if item.status == "queued":
+def next_item(db_path: Path) -> dict | None:
+    for item in load_db_raw(db_path):
+        if item["status"] == "queued":
             return item
     return None
 
 
-def export_markdown(db_path: Path, out_path: Path) -> Path:
-    items = load_db(db_path)
-    lines = ["# Lab queue", ""]
+def _markdown_chunks(items: List[dict]) -> Iterator[str]:
+    yield "# Lab queue\n\n"
     if not items:
-        lines.append("_No items queued._")
-    for item in items:
-        lines.append(f"## {item.title}")
-        lines.append(f"- id: `{item.id}`")
-        lines.append(f"- status: {item.status}")
-        lines.append(f"- severity: {item.severity}")
-        lines.append(f"- created_at: {item.created_at}")
-        if item.scope:
-            lines.append(f"- scope: {item.scope}")
-        if item.notes:
-            lines.append("")
-            lines.append(item.notes)
-        lines.append("")
+        yield "_No items queued._\n"
+        return
+    last = len(items) - 1
+    for idx, item in enumerate(items):
+        block = (
+            ITEM_BLOCK % item
+            + ("- scope: %s\n" % item["scope"] if item["scope"] else "")
+            + ("\n%s\n" % item["notes"] if item["notes"] else "")
+        )
+        # blank line between items; the file ends with exactly one newline
+        yield block + "\n" if idx < last else block.rstrip() + "\n"
+
+
+def export_markdown(db_path: Path, out_path: Path) -> Path:
+    items = load_db_raw(db_path)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text("\n".join(lines).strip() + "\n")
+    with out_path.open("wb") as fh:
+        fh.writelines(chunk.encode("utf-8") for chunk in _markdown_chunks(items))
     return out_path
 
 
+def _cmd_add(args: argparse.Namespace) -> None:
+    item = add_item(args.db, args.title, args.scope, args.notes, args.severity)
+    print(f"[+] Added {item.title} (id={item.id})")
+
+
+def _cmd_list(args: argparse.Namespace) -> None:
+    for item in list_items(args.db):
+        print(f"{item['id']} [{item['status']}] ({item['severity']}) {item['title']}  scope={item['scope'] or '-'}")
+
+
+def _cmd_next(args: argparse.Namespace) -> None:
+    item = next_item(args.db)
+    if item:
+        print(f"{item['id']} [{item['status']}] ({item['severity']}) {item['title']}  scope={item['scope'] or '-'}")
+    else:
+        print("Queue empty.")
+
+
+def _cmd_done(args: argparse.Namespace) -> None:
+    item = complete_item(args.db, args.id)
+    print(f"[+] Marked done: {item['title']} (id={item['id']})")
+
+
+def _cmd_export(args: argparse.Namespace) -> None:
+    out_path = export_markdown(args.db, args.out)
+    print(f"[+] Exported Markdown -> {out_path}")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Lab Queue - track lab tasks/targets with scope notes. "
-        "Stores data in tools/lab-queue/db.json.",
+        "Stores data in tools/lab-queue/db.jsonl.",
     )
-    parser.add_argument("--db", type=Path, default=DB_PATH, help="Path to DB JSON (default: tools/lab-queue/db.json)")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="Path to DB JSON lines (default: tools/lab-queue/db.jsonl)")
     sub = parser.add_subparsers(dest="command", required=True)
 
     add_cmd = sub.add_parser("add", help="Add a new lab item")
+    add_cmd.set_defaults(func=_cmd_add)
     add_cmd.add_argument("--title", required=True, help="Short title/target")
     add_cmd.add_argument("--scope", default="", help="Scope reminder or authorization note")
     add_cmd.add_argument("--notes", default="", help="Freeform notes")
     add_cmd.add_argument("--severity", default="info", help="info|low|med|high|critical")
 
-    sub.add_parser("list", help="List all items")
-    sub.add_parser("next", help="Show next queued item")
+    sub.add_parser("list", help="List all items").set_defaults(func=_cmd_list)
+    sub.add_parser("next", help="Show next queued item").set_defaults(func=_cmd_next)
 
     complete_cmd = sub.add_parser("done", help="Mark an item done")
+    complete_cmd.set_defaults(func=_cmd_done)
     complete_cmd.add_argument("--id", type=int, required=True, help="Item ID")
 
     export_cmd = sub.add_parser("export", help="Export queue to Markdown")
+    export_cmd.set_defaults(func=_cmd_export)
     export_cmd.add_argument("--out", type=Path, default=Path("tools/lab-queue/queue.md"), help="Markdown output path")
 
     args = parser.parse_args()
-    db_path: Path = args.db
-
-    if args.command == "add":
-        item = add_item(db_path, args.title, args.scope, args.notes, args.severity)
-        print(f"[+] Added {item.title} (id={item.id})")
-    elif args.command == "list":
-        for item in list_items(db_path):
-            print(f"{item.id} [{item.status}] ({item.severity}) {item.title}  scope={item.scope or '-'}")
-    elif args.command == "next":
-        item = next_item(db_path)
-        if item:
-            print(f"{item.id} [{item.status}] ({item.severity}) {item.title}  scope={item.scope or '-'}")
-        else:
-            print("Queue empty.")
-    elif args.command == "done":
-        item = complete_item(db_path, args.id)
-        print(f"[+] Marked done: {item.title} (id={item.id})")
-    elif args.command == "export":
-        out_path = export_markdown(db_path, args.out)
-        print(f"[+] Exported Markdown -> {out_path}")
-    else:
-        parser.print_help()
+    if args.db == DB_PATH:
+        migrate_default_db()
+    args.func(args)
 
 
 if __name__ == "__main__":